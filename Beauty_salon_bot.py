@@ -0,0 +1,1113 @@
+"""
+Телеграм-бот записи в салон красоты.
+
+Клиент выбирает услугу, дату и время, оставляет телефон — запись попадает
+в SQLite, администратор получает уведомление. Для админа есть отдельная
+панель: просмотр всех записей, аналитика, ручное добавление и удаление
+клиентов. Бот старается держать чат «чистым»: меню редактируются, а не
+дублируются новыми сообщениями.
+
+Запуск:
+    pip install aiogram aiosqlite uvloop
+    python Beauty_salon_bot.py
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import re
+import time
+from datetime import date, datetime, timedelta
+
+import uvloop
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import CommandStart
+from aiogram.filters.callback_data import CallbackData
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.types import (
+    CallbackQuery,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    Message,
+    ReplyKeyboardMarkup,
+)
+
+from confi23g import (
+    ADMIN_ID,
+    ALL_TIME_SLOTS,
+    BOT_TOKEN,
+    INFO_MESSAGE,
+    SALON_ADDRESS,
+    SALON_HOURS,
+    SALON_NAME,
+    SALON_PHONE,
+    SERVICES,
+    WELCOME_MESSAGE,
+)
+from databas23e import db
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+router = Router()
+bot_instance: Bot | None = None
+
+# Текст «ℹ️ Информация» собран из констант, поэтому форматируется один раз
+_INFO_TEXT = INFO_MESSAGE.format(
+    salon_name=SALON_NAME,
+    address=SALON_ADDRESS,
+    phone=SALON_PHONE,
+    hours=SALON_HOURS,
+    services="\n".join(f"  {service}" for service in SERVICES),
+)
+
+# Ссылки на фоновые задачи, чтобы их не собрал GC до завершения
+_bg_tasks: set[asyncio.Task] = set()
+
+
+def notify_admin_in_background(text: str) -> None:
+    """Планирует уведомление админу, не задерживая ответ клиенту."""
+    task = asyncio.create_task(send_admin_notification(text))
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+
+
+class FastMemoryStorage(BaseStorage):
+    """Хранилище FSM в обычных словарях, без блокировок.
+
+    Штатный MemoryStorage сериализует доступ через asyncio.Lock, но все
+    операции здесь — чистая работа с памятью без await внутри, а
+    однопоточный event loop и так даёт взаимное исключение между
+    корутинами. Блокировка была бы чистыми накладными расходами на
+    каждый из 2–4 FSM-вызовов на клик.
+
+    Брошенные диалоги истекают через ttl секунд, чтобы словари не росли
+    неограниченно: дедлайн обновляется при каждой записи, просроченные
+    ключи выметаются попутно, не чаще раза в ttl.
+    """
+
+    def __init__(self, ttl: float = 600.0) -> None:
+        self._states: dict[StorageKey, str] = {}
+        self._data: dict[StorageKey, dict] = {}
+        self._deadlines: dict[StorageKey, float] = {}
+        self._ttl = ttl
+        self._next_sweep = time.monotonic() + ttl
+
+    def _touch(self, key: StorageKey) -> None:
+        now = time.monotonic()
+        self._deadlines[key] = now + self._ttl
+        if now >= self._next_sweep:
+            for k in [k for k, dl in self._deadlines.items() if dl <= now]:
+                del self._deadlines[k]
+                self._states.pop(k, None)
+                self._data.pop(k, None)
+            self._next_sweep = now + self._ttl
+
+    async def set_state(self, key: StorageKey, state=None) -> None:
+        if state is None:
+            self._states.pop(key, None)
+        else:
+            self._states[key] = state.state if isinstance(state, State) else state
+            self._touch(key)
+
+    async def get_state(self, key: StorageKey):
+        return self._states.get(key)
+
+    async def set_data(self, key: StorageKey, data: dict) -> None:
+        if data:
+            self._data[key] = data
+            self._touch(key)
+        else:
+            self._data.pop(key, None)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        return self._data.get(key, {}).copy()
+
+    async def update_data(self, key: StorageKey, data: dict) -> dict:
+        current = self._data.setdefault(key, {})
+        current.update(data)
+        self._touch(key)
+        return current.copy()
+
+    async def close(self) -> None:
+        self._states.clear()
+        self._data.clear()
+        self._deadlines.clear()
+
+
+class BookingStates(StatesGroup):
+    """Состояния клиентского сценария записи."""
+
+    selecting_service = State()
+    selecting_date = State()
+    selecting_time = State()
+    entering_phone = State()
+    selecting_new_date = State()
+    selecting_new_time = State()
+
+
+class AdminStates(StatesGroup):
+    """Состояния админских сценариев."""
+
+    adding_client_name = State()
+    adding_client_phone = State()
+    deleting_client = State()
+
+
+# sep="|": в значениях бывают слоты вида "10:00", а двоеточие —
+# разделитель CallbackData по умолчанию
+class AdminCB(CallbackData, prefix="a", sep="|"):
+    """Типизированные колбэки админской ручной записи.
+
+    Диспетчер aiogram матчит фабрику по префиксу одной хеш-проверкой
+    вместо последовательных startswith по всем хендлерам.
+    """
+
+    kind: str
+    val: str
+
+
+# ============================================================
+# Короткоживущие кэши частых выборок из базы
+# ============================================================
+
+# user_id -> (момент записи, список записей клиента)
+_user_bookings_cache: dict[int, tuple[float, list]] = {}
+# booking_date -> (момент записи, занятые слоты)
+_occupied_slots_cache: dict[str, tuple[float, list]] = {}
+_USER_BOOKINGS_TTL = 5.0
+_OCCUPIED_SLOTS_TTL = 10.0
+
+
+async def fetch_user_bookings(user_id: int) -> list:
+    """db.get_user_bookings с кэшем на несколько секунд."""
+    cached = _user_bookings_cache.get(user_id)
+    now = time.monotonic()
+    if cached and now - cached[0] < _USER_BOOKINGS_TTL:
+        return cached[1]
+    bookings = await db.get_user_bookings(user_id)
+    _user_bookings_cache[user_id] = (now, bookings)
+    return bookings
+
+
+async def fetch_occupied_slots(booking_date: str) -> list:
+    """db.get_occupied_slots с кэшем на несколько секунд."""
+    cached = _occupied_slots_cache.get(booking_date)
+    now = time.monotonic()
+    if cached and now - cached[0] < _OCCUPIED_SLOTS_TTL:
+        return cached[1]
+    slots = await db.get_occupied_slots(booking_date)
+    _occupied_slots_cache[booking_date] = (now, slots)
+    return slots
+
+
+def invalidate_booking_caches(user_id=None, booking_date=None) -> None:
+    """Сбрасывает кэши после добавления/удаления записи."""
+    if user_id is not None:
+        _user_bookings_cache.pop(user_id, None)
+    if booking_date is not None:
+        _occupied_slots_cache.pop(booking_date, None)
+
+
+# ============================================================
+# Клавиатуры
+# ============================================================
+
+def _build_main_kb() -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="📝 Записаться")],
+            [KeyboardButton(text="📋 Мои записи"), KeyboardButton(text="⭐ Отзывы")],
+            [KeyboardButton(text="ℹ️ Информация"), KeyboardButton(text="📞 Контакты")],
+        ],
+        resize_keyboard=True,
+    )
+
+
+def _build_admin_kb() -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="👥 Все записи"), KeyboardButton(text="📊 Аналитика")],
+            [KeyboardButton(text="➕ Добавить клиента"), KeyboardButton(text="➖ Удалить клиента")],
+            [KeyboardButton(text="👤 Режим клиента")],
+        ],
+        resize_keyboard=True,
+    )
+
+
+def _build_phone_kb() -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [KeyboardButton(text="📱 Отправить мой номер", request_contact=True)],
+            [KeyboardButton(text="⬅️ Назад")],
+        ],
+        resize_keyboard=True,
+    )
+
+
+# Reply-клавиатуры неизменяемы — строим по одному экземпляру на процесс:
+# главное меню клиента, меню администратора и запрос телефона
+MAIN_KB = _build_main_kb()
+ADMIN_KB = _build_admin_kb()
+PHONE_KB = _build_phone_kb()
+
+
+def _build_services_keyboard(with_back: bool) -> InlineKeyboardMarkup:
+    buttons = []
+    for i, service in enumerate(SERVICES):
+        buttons.append([
+            InlineKeyboardButton(text=service, callback_data=f"service_{i}")
+        ])
+    if with_back:
+        buttons.append([
+            InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_start")
+        ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+# SERVICES — константа, поэтому оба варианта клавиатуры строятся один раз
+_SERVICES_KB_WITH_BACK = _build_services_keyboard(with_back=True)
+_SERVICES_KB_NO_BACK = _build_services_keyboard(with_back=False)
+
+# Инлайн-клавиатуры админских диалогов — тоже неизменяемые
+CANCEL_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⬅️ Отмена", callback_data="admin_cancel")]
+])
+SKIP_PHONE_KB = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="⏭ Пропустить", callback_data="admin_skip_phone")],
+    [InlineKeyboardButton(text="⬅️ Отмена", callback_data="admin_cancel")],
+])
+
+
+def get_services_keyboard(with_back: bool = False) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура выбора услуги."""
+    return _SERVICES_KB_WITH_BACK if with_back else _SERVICES_KB_NO_BACK
+
+
+_WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+@functools.lru_cache(maxsize=8)
+def _build_dates_kb(today_ordinal: int, days_ahead: int, with_back: bool) -> InlineKeyboardMarkup:
+    buttons = []
+    for i in range(days_ahead):
+        day = date.fromordinal(today_ordinal + i)
+        display = f"{_WEEKDAYS[day.weekday()]} {day.day:02d}.{day.month:02d}.{day.year}"
+        buttons.append([
+            InlineKeyboardButton(
+                text=display,
+                callback_data=f"date_{day.year:04d}{day.month:02d}{day.day:02d}",
+            )
+        ])
+    if with_back:
+        buttons.append([
+            InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_service")
+        ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_dates_keyboard(days_ahead: int = 7, with_back: bool = True) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура выбора даты на ближайшие дни.
+
+    Результат меняется только при смене календарного дня, поэтому
+    кэшируется по порядковому номеру сегодняшней даты.
+    """
+    return _build_dates_kb(datetime.now().toordinal(), days_ahead, with_back)
+
+
+async def get_time_keyboard(booking_date: str) -> InlineKeyboardMarkup:
+    """Инлайн-клавиатура свободных слотов времени на дату."""
+    occupied = set(await fetch_occupied_slots(booking_date))
+    available_slots = [slot for slot in ALL_TIME_SLOTS if slot not in occupied]
+
+    if not available_slots:
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="😔 Свободных мест нет", callback_data="no_slots")],
+            [InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_service")],
+        ])
+
+    # Слоты парами по два в ряд, без проверок границ в цикле
+    it = iter(available_slots)
+    buttons = [
+        [InlineKeyboardButton(text=f"✅ {a}", callback_data=f"time_{a}")]
+        + ([InlineKeyboardButton(text=f"✅ {b}", callback_data=f"time_{b}")] if b else [])
+        for a, b in itertools.zip_longest(it, it)
+    ]
+    buttons.append([
+        InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_service")
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def get_bookings_keyboard(bookings: list) -> InlineKeyboardMarkup:
+    """Кнопки отмены/переноса для уже загруженного списка записей."""
+    buttons = []
+    for booking in bookings:
+        date_display = _display_date(date.fromisoformat(booking['booking_date']))
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"❌ Отменить {date_display} {booking['booking_time']}",
+                callback_data=f"cancel_{booking['id']}",
+            )
+        ])
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"🔄 Перенести {date_display} {booking['booking_time']}",
+                callback_data=f"reschedule_{booking['id']}",
+            )
+        ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+# ============================================================
+# Вспомогательные функции
+# ============================================================
+
+def _display_date(d: date) -> str:
+    """ДД.ММ.ГГГГ без strftime — заметно дешевле на горячих путях."""
+    return f"{d.day:02d}.{d.month:02d}.{d.year}"
+
+
+def format_booking_text(booking) -> str:
+    """Человекочитаемое описание одной записи (принимает aiosqlite.Row)."""
+    d = booking['booking_date']
+    return (
+        f"💎 {booking['service']}\n"
+        f"📅 {d[8:10]}.{d[5:7]}.{d[:4]} в {booking['booking_time']}"
+    )
+
+
+# Значения username/phone, которые не показываем как есть
+_HIDDEN_USERNAMES = frozenset({None, '', 'admin_added'})
+# 'None' строкой — наследие старых записей, где пропуск телефона
+# сохранялся именно так
+_EMPTY_PHONES = frozenset({None, '', 'None'})
+
+
+def format_user_info(booking) -> str:
+    """Описание клиента из записи (для админских сообщений)."""
+    username = booking['username']
+    if username not in _HIDDEN_USERNAMES:
+        name_display = f"@{username}"
+    else:
+        name_display = f"{booking['first_name']} {booking['last_name'] or ''}".strip()
+    phone = booking['phone']
+    if phone not in _EMPTY_PHONES:
+        return f"{name_display}, 📞 {phone}"
+    return name_display
+
+
+# Счётчик синтетических user_id; пересеивается из базы при старте
+_admin_user_ids = itertools.count(900_000_000)
+
+
+def generate_admin_user_id() -> int:
+    """Синтетический user_id для клиентов, добавленных админом вручную.
+
+    Монотонный счётчик вместо random.randint исключает коллизии
+    и необходимость повторных попыток вставки.
+    """
+    return next(_admin_user_ids)
+
+
+def _fmt_admin_event(title, first_name, last_name, username, phone, service,
+                     date_display, time_str, *, date_label="Дата", time_label="Время"):
+    """Единый формат уведомлений админу о событиях с записями."""
+    username_display = f"@{username}" if username else "нет"
+    return "\n".join((
+        title,
+        "",
+        f"👤 Клиент: {first_name} {last_name or ''}",
+        f"🆔 Username: {username_display}",
+        f"📞 Телефон: {phone}",
+        f"💎 Услуга: {service}",
+        f"📅 {date_label}: {date_display}",
+        f"🕐 {time_label}: {time_str}",
+    ))
+
+
+def is_admin(user_id: int) -> bool:
+    """Проверяет, является ли пользователь администратором.
+
+    ID кэширован из конфига: без await и без похода в базу на каждое
+    входящее сообщение (в настройках он дублируется только для
+    внешних инструментов).
+    """
+    return user_id == ADMIN_ID
+
+
+async def send_admin_notification(text: str) -> None:
+    """Шлёт уведомление админу с повторами при сетевых сбоях."""
+    max_attempts = 3
+    for attempt in range(max_attempts):
+        try:
+            await bot_instance.send_message(ADMIN_ID, text)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("✅ Уведомление отправлено администратору")
+            return
+        except Exception as e:
+            logger.warning(f"Попытка {attempt + 1} отправки уведомления не удалась: {e}")
+            if attempt < max_attempts - 1:
+                # Экспоненциальная пауза: 0.25с, 0.5с, 1с
+                await asyncio.sleep(0.25 * (2 ** attempt))
+    logger.error("Уведомление администратору не доставлено после всех попыток")
+
+
+# ============================================================
+# Клиентские хендлеры
+# ============================================================
+
+@router.message(CommandStart())
+async def cmd_start(message: Message, state: FSMContext):
+    await state.clear()
+    if is_admin(message.from_user.id):
+        await message.answer(
+            "👋 Здравствуйте! Вы вошли как администратор.",
+            reply_markup=ADMIN_KB,
+        )
+        return
+    await message.answer(
+        WELCOME_MESSAGE.format(salon_name=SALON_NAME),
+        reply_markup=MAIN_KB,
+    )
+
+
+@router.message(F.text == "📝 Записаться")
+async def start_booking(message: Message, state: FSMContext):
+    await state.set_state(BookingStates.selecting_service)
+    await message.answer(
+        "💎 Выберите услугу:",
+        reply_markup=get_services_keyboard(with_back=True),
+    )
+
+
+async def back_to_start(callback: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await callback.message.delete()
+    await callback.message.answer(
+        "Вы в главном меню 👇",
+        reply_markup=MAIN_KB,
+    )
+    await callback.answer()
+
+
+async def back_to_service(callback: CallbackQuery, state: FSMContext):
+    await state.set_state(BookingStates.selecting_service)
+    await callback.message.edit_text(
+        "💎 Выберите услугу:",
+        reply_markup=get_services_keyboard(with_back=True),
+    )
+    await callback.answer()
+
+
+async def process_service_selection(callback: CallbackQuery, state: FSMContext):
+    service_idx = int(callback.data.removeprefix("service_"))
+    service = SERVICES[service_idx]
+    await state.update_data(selected_service=service)
+    await state.set_state(BookingStates.selecting_date)
+    await callback.message.edit_text(
+        f"💎 Услуга: {service}\n\n📅 Выберите дату:",
+        reply_markup=get_dates_keyboard(),
+    )
+    await callback.answer()
+
+
+async def process_date_selection(callback: CallbackQuery, state: FSMContext):
+    date_str = callback.data.removeprefix("date_")
+    date_obj = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+    booking_date = date_obj.isoformat()
+    date_display = _display_date(date_obj)
+    # Одно чтение FSM-хранилища вместо чтения после записи
+    data = await state.get_data()
+    service = data.get('selected_service')
+    await state.update_data(
+        selected_date=date_display,
+        booking_date=booking_date,
+    )
+    await state.set_state(BookingStates.selecting_time)
+    await callback.message.edit_text(
+        f"💎 Услуга: {service}\n"
+        f"📅 Дата: {date_display}\n\n"
+        f"🕐 Выберите время:",
+        reply_markup=await get_time_keyboard(booking_date),
+    )
+    await callback.answer()
+
+
+async def process_no_slots(callback: CallbackQuery, state: FSMContext):
+    await callback.answer("😔 На эту дату всё занято, выберите другую", show_alert=True)
+
+
+async def process_time_selection(callback: CallbackQuery, state: FSMContext):
+    booking_time = callback.data.removeprefix("time_")
+    data = await state.get_data()
+    await state.update_data(booking_time=booking_time)
+    await state.set_state(BookingStates.entering_phone)
+    # Удаляем меню и шлём одно сообщение с итогом и клавиатурой телефона
+    # вместо edit_text + answer — меньше последовательных вызовов API
+    await callback.message.delete()
+    await callback.message.answer(
+        f"💎 Услуга: {data.get('selected_service')}\n"
+        f"📅 Дата: {data.get('selected_date')}\n"
+        f"🕐 Время: {booking_time}\n\n"
+        "📱 Остался один шаг — оставьте номер телефона.\n"
+        "👇 Нажмите кнопку или введите номер вручную:",
+        reply_markup=PHONE_KB,
+    )
+    await callback.answer()
+
+
+@router.message(F.text == "⬅️ Назад", BookingStates.entering_phone)
+async def back_from_phone(message: Message, state: FSMContext):
+    await state.set_state(BookingStates.selecting_time)
+    data = await state.get_data()
+    await message.answer(
+        f"💎 Услуга: {data.get('selected_service')}\n"
+        f"📅 Дата: {data.get('selected_date')}\n\n"
+        f"🕐 Выберите время:",
+        reply_markup=await get_time_keyboard(data.get('booking_date')),
+    )
+
+
+@router.message(F.contact, BookingStates.entering_phone)
+async def process_phone_contact(message: Message, state: FSMContext):
+    await finalize_booking(message, state, message.contact.phone_number)
+
+
+# Плюс (опционально), затем минимум 10 цифр с привычными разделителями
+_PHONE_RE = re.compile(r'^\+?\d[\d\s\-()]{9,}$')
+_PHONE_SEPARATORS_RE = re.compile(r'[\s\-()]')
+
+
+@router.message(F.text, BookingStates.entering_phone)
+async def process_phone_text(message: Message, state: FSMContext):
+    phone = message.text.strip()
+    if not _PHONE_RE.match(phone):
+        await message.answer(
+            "❌ Некорректный номер, попробуйте ещё раз:",
+            reply_markup=PHONE_KB,
+        )
+        return
+    # В базу кладём каноничную форму без разделителей
+    await finalize_booking(message, state, _PHONE_SEPARATORS_RE.sub('', phone))
+
+
+async def finalize_booking(message: Message, state: FSMContext, phone: str):
+    """Записывает клиента в базу и уведомляет администратора."""
+    data = await state.get_data()
+    user = message.from_user
+    success = await db.add_booking(
+        user_id=user.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        phone=phone,
+        service=data.get('selected_service'),
+        booking_date=data.get('booking_date'),
+        booking_time=data.get('booking_time'),
+    )
+    await state.clear()
+    invalidate_booking_caches(user.id, data.get('booking_date'))
+
+    if not success:
+        await message.answer(
+            "😔 Увы, это время только что заняли. Попробуйте выбрать другое.",
+            reply_markup=MAIN_KB,
+        )
+        return
+
+    await message.answer(
+        f"✅ Вы записаны!\n\n"
+        f"💎 Услуга: {data.get('selected_service')}\n"
+        f"📅 Дата: {data.get('selected_date')}\n"
+        f"🕐 Время: {data.get('booking_time')}\n\n"
+        f"Ждём вас в {SALON_NAME}! 🌸",
+        reply_markup=MAIN_KB,
+    )
+
+    notify_admin_in_background(_fmt_admin_event(
+        "🔔 Новая запись!",
+        user.first_name, user.last_name, user.username, phone,
+        data.get('selected_service'),
+        data.get('selected_date'), data.get('booking_time'),
+    ))
+
+
+@router.message(F.text == "📋 Мои записи")
+async def show_my_bookings(message: Message):
+    bookings = await fetch_user_bookings(message.from_user.id)
+    if not bookings:
+        await message.answer(
+            "📋 У вас пока нет записей.\n\nНажмите «📝 Записаться», чтобы выбрать услугу!",
+            reply_markup=MAIN_KB,
+        )
+        return
+    text = "📋 Ваши записи:\n\n"
+    for booking in bookings:
+        text += format_booking_text(booking) + "\n\n"
+    await message.answer(
+        text,
+        reply_markup=get_bookings_keyboard(bookings),
+    )
+
+
+async def process_cancel_booking(callback: CallbackQuery, state: FSMContext):
+    booking_id = int(callback.data.removeprefix("cancel_"))
+    booking = await db.get_booking_by_id(booking_id)
+    if not booking:
+        await callback.answer("Запись не найдена", show_alert=True)
+        return
+    await db.delete_booking(booking_id)
+    invalidate_booking_caches(booking['user_id'], booking['booking_date'])
+    date_display = _display_date(date.fromisoformat(booking['booking_date']))
+    await callback.message.edit_text(
+        f"❌ Запись отменена:\n\n"
+        f"💎 {booking['service']}\n"
+        f"📅 {date_display} в {booking['booking_time']}"
+    )
+    await callback.answer()
+
+    notify_admin_in_background(_fmt_admin_event(
+        "🔕 Запись отменена клиентом",
+        booking['first_name'], booking['last_name'], booking['username'],
+        booking['phone'], booking['service'],
+        date_display, booking['booking_time'],
+    ))
+
+
+async def process_reschedule_booking(callback: CallbackQuery, state: FSMContext):
+    booking_id = int(callback.data.removeprefix("reschedule_"))
+    booking = await db.get_booking_by_id(booking_id)
+    if not booking:
+        await callback.answer("Запись не найдена", show_alert=True)
+        return
+    await state.update_data(reschedule_id=booking_id)
+    await state.set_state(BookingStates.selecting_new_date)
+    await callback.message.edit_text(
+        f"🔄 Перенос записи:\n\n{format_booking_text(booking)}\n\n"
+        f"📅 Выберите новую дату:",
+        reply_markup=get_dates_keyboard(with_back=False),
+    )
+    await callback.answer()
+
+
+async def process_reschedule_date(callback: CallbackQuery, state: FSMContext):
+    date_str = callback.data.removeprefix("date_")
+    date_obj = date(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]))
+    booking_date = date_obj.isoformat()
+    await state.update_data(new_booking_date=booking_date)
+    await state.set_state(BookingStates.selecting_new_time)
+    await callback.message.edit_text(
+        f"📅 Новая дата: {_display_date(date_obj)}\n\n🕐 Выберите время:",
+        reply_markup=await get_time_keyboard(booking_date),
+    )
+    await callback.answer()
+
+
+async def process_reschedule_time(callback: CallbackQuery, state: FSMContext):
+    new_time = callback.data.removeprefix("time_")
+    data = await state.get_data()
+    booking = await db.get_booking_by_id(data.get('reschedule_id'))
+    await state.clear()
+    if not booking:
+        await callback.answer("Запись не найдена", show_alert=True)
+        return
+
+    new_date = data.get('new_booking_date')
+    await db.delete_booking(booking['id'])
+    success = await db.add_booking(
+        user_id=booking['user_id'],
+        username=booking['username'],
+        first_name=booking['first_name'],
+        last_name=booking['last_name'],
+        phone=booking['phone'],
+        service=booking['service'],
+        booking_date=new_date,
+        booking_time=new_time,
+    )
+    invalidate_booking_caches(booking['user_id'], booking['booking_date'])
+    invalidate_booking_caches(booking_date=new_date)
+    if not success:
+        await callback.message.edit_text(
+            "😔 Это время уже заняли. Запись осталась без изменений — "
+            "попробуйте перенести ещё раз."
+        )
+        # Возвращаем исходную запись на место
+        await db.add_booking(
+            user_id=booking['user_id'],
+            username=booking['username'],
+            first_name=booking['first_name'],
+            last_name=booking['last_name'],
+            phone=booking['phone'],
+            service=booking['service'],
+            booking_date=booking['booking_date'],
+            booking_time=booking['booking_time'],
+        )
+        await callback.answer()
+        return
+
+    new_date_display = _display_date(date.fromisoformat(new_date))
+    await callback.message.edit_text(
+        f"✅ Запись перенесена!\n\n"
+        f"💎 {booking['service']}\n"
+        f"📅 {new_date_display} в {new_time}"
+    )
+    await callback.answer()
+
+    notify_admin_in_background(_fmt_admin_event(
+        "🔄 Запись перенесена клиентом",
+        booking['first_name'], booking['last_name'], booking['username'],
+        booking['phone'], booking['service'],
+        new_date_display, new_time,
+        date_label="Новая дата", time_label="Новое время",
+    ))
+
+
+@router.message(F.text == "⭐ Отзывы")
+async def show_reviews(message: Message):
+    await message.answer(
+        "⭐ Отзывы наших клиентов:\n\n"
+        "«Прекрасный салон, хожу уже год!» — Анна\n"
+        "«Лучшее окрашивание в городе» — Мария\n"
+        "«Всегда вовремя и очень уютно» — Ольга\n\n"
+        "Будем рады и вашему отзыву! 💬",
+        reply_markup=MAIN_KB,
+    )
+
+
+@router.message(F.text == "ℹ️ Информация")
+async def show_info(message: Message):
+    await message.answer(_INFO_TEXT, reply_markup=MAIN_KB)
+
+
+@router.message(F.text == "📞 Контакты")
+async def show_contacts(message: Message):
+    await message.answer(
+        f"📞 Телефон: {SALON_PHONE}\n📍 Адрес: {SALON_ADDRESS}",
+        reply_markup=MAIN_KB,
+    )
+
+
+# ============================================================
+# Админские хендлеры
+# ============================================================
+
+@router.message(F.text == "👤 Режим клиента")
+async def switch_to_client_mode(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        return
+    await state.clear()
+    await message.answer(
+        WELCOME_MESSAGE.format(salon_name=SALON_NAME),
+        reply_markup=MAIN_KB,
+    )
+
+
+@router.message(F.text == "👥 Все записи")
+async def admin_view_clients(message: Message):
+    if not is_admin(message.from_user.id):
+        return
+    bookings = await db.get_all_bookings()
+    if not bookings:
+        await message.answer("👥 Записей пока нет.", reply_markup=ADMIN_KB)
+        return
+
+    lines = ["👥 Все записи:\n"]
+    for booking in bookings:
+        # booking_date уже в виде YYYY-MM-DD — переставляем срезами
+        d = booking['booking_date']
+        lines.append(
+            f"━━━━━━━━━━━━━\n"
+            f"🆔 ID: {booking['id']}\n"
+            f"👤 {format_user_info(booking)}\n"
+            f"💎 {booking['service']}\n"
+            f"📅 {d[8:10]}.{d[5:7]}.{d[:4]} {booking['booking_time']}\n\n"
+        )
+    lines.append(f"━━━━━━━━━━━━━\n📊 Всего записей: {len(bookings)}")
+
+    # Пакуем блоки в сообщения ≤4000 символов, не разрывая запись посередине
+    chunk: list[str] = []
+    chunk_len = 0
+    for block in lines:
+        if chunk and chunk_len + len(block) > 4000:
+            await message.answer("".join(chunk))
+            chunk = []
+            chunk_len = 0
+        chunk.append(block)
+        chunk_len += len(block)
+    await message.answer("".join(chunk))
+
+
+@router.message(F.text == "📊 Аналитика")
+async def admin_analytics(message: Message):
+    if not is_admin(message.from_user.id):
+        return
+    stats = await db.get_statistics_summary()
+    popular = "\n".join(
+        f"  • {service}: {count}" for service, count in stats['popular_services']
+    )
+    text = (
+        f"📊 Аналитика салона\n\n"
+        f"📝 Всего записей: {stats['total_bookings']}\n"
+        f"📅 Записей на сегодня: {stats['today_bookings']}\n"
+        f"👥 Уникальных клиентов: {stats['unique_clients']}\n\n"
+        f"🏆 Популярные услуги:\n{popular}"
+    )
+    await message.answer(text, reply_markup=ADMIN_KB)
+
+
+@router.message(F.text == "➕ Добавить клиента")
+async def admin_add_client_start(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        return
+    await state.set_state(AdminStates.adding_client_name)
+    await message.answer("👤 Введите имя клиента (и фамилию через пробел):",
+                         reply_markup=CANCEL_KB)
+
+
+@router.message(AdminStates.adding_client_name)
+async def admin_add_client_name(message: Message, state: FSMContext):
+    # partition вместо split: одно выделение строки без списка частей
+    first_name, _, last_name = message.text.strip().partition(" ")
+    first_name = first_name or "Клиент"
+    await state.update_data(client_first_name=first_name, client_last_name=last_name)
+    await state.set_state(AdminStates.adding_client_phone)
+    await message.answer("📞 Введите телефон клиента:", reply_markup=SKIP_PHONE_KB)
+
+
+async def _admin_ask_service(message: Message, state: FSMContext):
+    """Показывает админу выбор услуги для ручной записи."""
+    await state.set_state(None)
+    buttons = [
+        [InlineKeyboardButton(text=service,
+                              callback_data=AdminCB(kind="service", val=str(i)).pack())]
+        for i, service in enumerate(SERVICES)
+    ]
+    buttons.append([InlineKeyboardButton(text="⬅️ Отмена", callback_data="admin_cancel")])
+    await message.answer(
+        "💎 Выберите услугу:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
+    )
+
+
+@router.message(AdminStates.adding_client_phone)
+async def admin_add_client_phone(message: Message, state: FSMContext):
+    await state.update_data(client_phone=message.text.strip())
+    await _admin_ask_service(message, state)
+
+
+@router.callback_query(F.data == "admin_skip_phone")
+async def admin_skip_phone(callback: CallbackQuery, state: FSMContext):
+    # None, а не строка 'None': в базе это штатный NULL, и
+    # format_user_info не покажет телефон-заглушку
+    await state.update_data(client_phone=None)
+    await callback.message.delete()
+    await _admin_ask_service(callback.message, state)
+    await callback.answer()
+
+
+@router.callback_query(AdminCB.filter(F.kind == "service"))
+async def admin_add_client_service(callback: CallbackQuery, callback_data: AdminCB,
+                                   state: FSMContext):
+    service_idx = int(callback_data.val)
+    await state.update_data(client_service=SERVICES[service_idx])
+    weekdays = {0: "Пн", 1: "Вт", 2: "Ср", 3: "Чт", 4: "Пт", 5: "Сб", 6: "Вс"}
+    today = datetime.now()
+    buttons = []
+    for i in range(7):
+        date = today + timedelta(days=i)
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"{weekdays[date.weekday()]} {date.strftime('%d.%m.%Y')}",
+                callback_data=AdminCB(kind="date", val=date.strftime('%Y-%m-%d')).pack(),
+            )
+        ])
+    buttons.append([InlineKeyboardButton(text="⬅️ Отмена", callback_data="admin_cancel")])
+    await callback.message.edit_text(
+        "📅 Выберите дату:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
+    )
+    await callback.answer()
+
+
+@router.callback_query(AdminCB.filter(F.kind == "date"))
+async def admin_add_client_date(callback: CallbackQuery, callback_data: AdminCB,
+                                state: FSMContext):
+    booking_date = callback_data.val
+    await state.update_data(client_booking_date=booking_date)
+    occupied = set(await fetch_occupied_slots(booking_date))
+    available_slots = [slot for slot in ALL_TIME_SLOTS if slot not in occupied]
+    buttons = [
+        [InlineKeyboardButton(text=slot,
+                              callback_data=AdminCB(kind="time", val=slot).pack())]
+        for slot in available_slots
+    ]
+    buttons.append([InlineKeyboardButton(text="⬅️ Отмена", callback_data="admin_cancel")])
+    await callback.message.edit_text(
+        f"📅 Дата: {booking_date[8:10]}.{booking_date[5:7]}.{booking_date[:4]}\n\n"
+        f"🕐 Выберите время:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons),
+    )
+    await callback.answer()
+
+
+@router.callback_query(AdminCB.filter(F.kind == "time"))
+async def admin_add_client_time(callback: CallbackQuery, callback_data: AdminCB,
+                                state: FSMContext):
+    booking_time = callback_data.val
+    data = await state.get_data()
+    await state.clear()
+    user_id = generate_admin_user_id()
+    success = await db.add_booking(
+        user_id=user_id,
+        username='admin_added',
+        first_name=data.get('client_first_name'),
+        last_name=data.get('client_last_name'),
+        phone=data.get('client_phone'),
+        service=data.get('client_service'),
+        booking_date=data.get('client_booking_date'),
+        booking_time=booking_time,
+    )
+    invalidate_booking_caches(user_id, data.get('client_booking_date'))
+    if success:
+        d = data.get('client_booking_date')
+        result = (
+            f"✅ Клиент записан!\n\n"
+            f"👤 {data.get('client_first_name')} {data.get('client_last_name')}\n"
+            f"💎 {data.get('client_service')}\n"
+            f"📅 {d[8:10]}.{d[5:7]}.{d[:4]} в {booking_time}"
+        )
+    else:
+        result = "😔 Это время уже занято, начните заново."
+    # Реплай-клавиатура админа уже висит в чате с входа в админ-режим,
+    # второй answer только ради неё — лишний вызов API
+    await callback.message.edit_text(result)
+    await callback.answer()
+
+
+@router.message(F.text == "➖ Удалить клиента")
+async def admin_delete_client_start(message: Message, state: FSMContext):
+    if not is_admin(message.from_user.id):
+        return
+    await state.set_state(AdminStates.deleting_client)
+    await message.answer(
+        "🆔 Введите ID записи для удаления (виден в «👥 Все записи»):",
+        reply_markup=CANCEL_KB,
+    )
+
+
+@router.message(AdminStates.deleting_client)
+async def admin_delete_client_execute(message: Message, state: FSMContext):
+    await state.clear()
+    try:
+        booking_id = int(message.text.strip())
+    except ValueError:
+        await message.answer("❌ Нужно число — ID записи.", reply_markup=ADMIN_KB)
+        return
+    booking = await db.delete_booking_returning(booking_id)
+    if not booking:
+        await message.answer("❌ Запись не найдена.", reply_markup=ADMIN_KB)
+        return
+    invalidate_booking_caches(booking['user_id'], booking['booking_date'])
+    await message.answer(
+        f"✅ Запись удалена:\n\n👤 {format_user_info(booking)}\n"
+        f"💎 {booking['service']}\n"
+        f"📅 {booking['booking_date']} {booking['booking_time']}",
+        reply_markup=ADMIN_KB,
+    )
+
+
+@router.callback_query(F.data == "admin_cancel")
+async def admin_cancel(callback: CallbackQuery, state: FSMContext):
+    await state.clear()
+    await callback.message.edit_text("Действие отменено.")
+    await callback.answer()
+
+
+# ============================================================
+# Диспетчеризация клиентских колбэков
+# ============================================================
+#
+# Вместо цепочки из ~10 фильтров aiogram каждый клиентский колбэк
+# находит свой хендлер одним поиском по словарю. Регистрируется
+# последним, чтобы админские колбэки выше по файлу матчились первыми.
+
+async def _dispatch_date(callback: CallbackQuery, state: FSMContext):
+    """Разводит date_-колбэки по состоянию: обычная запись или перенос."""
+    current = await state.get_state()
+    if current == BookingStates.selecting_new_date.state:
+        await process_reschedule_date(callback, state)
+    elif current == BookingStates.selecting_date.state:
+        await process_date_selection(callback, state)
+    else:
+        await callback.answer()
+
+
+async def _dispatch_time(callback: CallbackQuery, state: FSMContext):
+    """Разводит time_-колбэки по состоянию: обычная запись или перенос."""
+    current = await state.get_state()
+    if current == BookingStates.selecting_new_time.state:
+        await process_reschedule_time(callback, state)
+    elif current == BookingStates.selecting_time.state:
+        await process_time_selection(callback, state)
+    else:
+        await callback.answer()
+
+
+_CALLBACK_EXACT = {
+    "back_to_start": back_to_start,
+    "back_to_service": back_to_service,
+    "no_slots": process_no_slots,
+}
+
+_CALLBACK_BY_PREFIX = {
+    "service": process_service_selection,
+    "date": _dispatch_date,
+    "time": _dispatch_time,
+    "cancel": process_cancel_booking,
+    "reschedule": process_reschedule_booking,
+}
+
+
+@router.callback_query()
+async def dispatch_client_callback(callback: CallbackQuery, state: FSMContext):
+    handler = _CALLBACK_EXACT.get(callback.data)
+    if handler is None:
+        handler = _CALLBACK_BY_PREFIX.get(callback.data.split("_", 1)[0])
+    if handler is None:
+        await callback.answer()
+        return
+    await handler(callback, state)
+
+
+# ============================================================
+# Запуск
+# ============================================================
+
+async def main():
+    global bot_instance, _admin_user_ids
+    await db.init_db()
+    await db.set_admin_id(ADMIN_ID)
+    max_admin_user_id = await db.get_max_admin_user_id()
+    if max_admin_user_id:
+        _admin_user_ids = itertools.count(max_admin_user_id + 1)
+    bot_instance = Bot(token=BOT_TOKEN)
+    dp = Dispatcher(storage=FastMemoryStorage())
+    dp.include_router(router)
+    logger.info("🚀 Бот запущен")
+    try:
+        await dp.start_polling(bot_instance)
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(main())
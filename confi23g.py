@@ -0,0 +1,49 @@
+"""Настройки бота салона красоты."""
+
+import os
+
+# Токен бота (получить у @BotFather)
+BOT_TOKEN = os.getenv("BOT_TOKEN", "PASTE_YOUR_TOKEN_HERE")
+
+# Telegram ID администратора салона
+ADMIN_ID = int(os.getenv("ADMIN_ID", "123456789"))
+
+# Информация о салоне
+SALON_NAME = "Салон красоты «Шарм»"
+SALON_ADDRESS = "г. Москва, ул. Цветочная, д. 7"
+SALON_PHONE = "+7 (900) 123-45-67"
+SALON_HOURS = "ежедневно с 10:00 до 20:00"
+
+# Список услуг салона
+SERVICES = [
+    "💇 Женская стрижка",
+    "💇‍♂️ Мужская стрижка",
+    "🎨 Окрашивание",
+    "💅 Маникюр",
+    "💆 Спа-уход",
+    "💄 Макияж",
+]
+
+# Все возможные слоты записи (шаг 30 минут)
+ALL_TIME_SLOTS = [
+    "10:00", "10:30", "11:00", "11:30",
+    "12:00", "12:30", "13:00", "13:30",
+    "14:00", "14:30", "15:00", "15:30",
+    "16:00", "16:30", "17:00", "17:30",
+    "18:00", "18:30", "19:00", "19:30",
+]
+
+WELCOME_MESSAGE = (
+    "👋 Добро пожаловать в {salon_name}!\n\n"
+    "Здесь вы можете записаться на услуги салона, "
+    "посмотреть свои записи и узнать информацию о нас.\n\n"
+    "Выберите действие на клавиатуре ниже 👇"
+)
+
+INFO_MESSAGE = (
+    "ℹ️ {salon_name}\n\n"
+    "📍 Адрес: {address}\n"
+    "📞 Телефон: {phone}\n"
+    "🕐 Часы работы: {hours}\n\n"
+    "💎 Наши услуги:\n{services}"
+)
@@ -0,0 +1,299 @@
+"""Работа с базой данных SQLite (через aiosqlite) для бота салона красоты."""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = "salon_bookings.db"
+
+# Горячие запросы — модульные константы: строка одна и та же на каждый
+# вызов, поэтому подготовленный план живёт в statement-кэше соединения
+_SQL_INSERT_BOOKING = """INSERT INTO bookings
+       (user_id, username, first_name, last_name, phone,
+        service, booking_date, booking_time)
+       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+       ON CONFLICT(booking_date, booking_time) DO NOTHING
+       RETURNING id"""
+_SQL_ALL_BOOKINGS = "SELECT * FROM bookings ORDER BY booking_date, booking_time"
+_SQL_USER_BOOKINGS = """SELECT * FROM bookings WHERE user_id = ?
+       ORDER BY booking_date, booking_time"""
+_SQL_OCCUPIED_SLOTS = "SELECT booking_time FROM bookings WHERE booking_date = ?"
+
+
+class Database:
+    """Обёртка над базой записей салона."""
+
+    def __init__(self, db_path: str = DB_PATH):
+        self.db_path = db_path
+        # Одно долгоживущее соединение: открытие соединения на каждый
+        # запрос стоит дороже самих коротких запросов
+        self._conn: aiosqlite.Connection | None = None
+        # Кэш сводки аналитики: (момент расчёта, словарь)
+        self._stats_cache: tuple[float, dict] | None = None
+        # Очередь событий статистики, пишется фоновой задачей пачками
+        self._stats_queue: asyncio.Queue | None = None
+        self._stats_task: asyncio.Task | None = None
+
+    async def init_db(self):
+        """Открывает общее соединение и создаёт таблицы, если их ещё нет."""
+        # cached_statements с запасом: восемь горячих запросов никогда
+        # не вытесняются из кэша подготовленных выражений sqlite3
+        db = self._conn = await aiosqlite.connect(
+            self.db_path, cached_statements=128
+        )
+        db.row_factory = aiosqlite.Row
+        # WAL + NORMAL: коммит без fsync журнала, читатели не блокируются
+        await db.execute("PRAGMA journal_mode=WAL")
+        await db.execute("PRAGMA synchronous=NORMAL")
+        await db.execute("PRAGMA temp_store=MEMORY")
+        await db.execute("PRAGMA cache_size=-20000")
+        await db.execute("PRAGMA mmap_size=134217728")
+        await db.execute("PRAGMA foreign_keys=ON")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS bookings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                phone TEXT,
+                service TEXT NOT NULL,
+                booking_date TEXT NOT NULL,
+                booking_time TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(booking_date, booking_time)
+            )
+        """)
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bookings_user_id ON bookings(user_id)"
+        )
+        await db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings(booking_date)"
+        )
+        # Список всех записей сортируется по автоиндексу
+        # UNIQUE(booking_date, booking_time); отдельный покрывающий индекс
+        # план не использует (SELECT * он покрыть не может)
+        await db.execute("DROP INDEX IF EXISTS idx_bookings_scan")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS statistics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action_type TEXT NOT NULL,
+                user_id INTEGER,
+                details TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        await db.commit()
+        self._stats_queue = asyncio.Queue()
+        self._stats_task = asyncio.create_task(self._stats_worker())
+        logger.info("База данных инициализирована")
+
+    async def add_booking(self, user_id, username, first_name, last_name,
+                          phone, service, booking_date, booking_time) -> bool:
+        """Добавляет запись. Возвращает False, если слот уже занят."""
+        # ON CONFLICT DO NOTHING вместо перехвата IntegrityError:
+        # занятый слот — штатная ветка, а не исключение
+        cursor = await self._conn.execute(
+            _SQL_INSERT_BOOKING,
+            (user_id, username, first_name, last_name, phone,
+             service, booking_date, booking_time),
+        )
+        row = await cursor.fetchone()
+        await self._conn.commit()
+        if row is None:
+            return False
+        self._stats_cache = None
+        await self.add_statistics(
+            'booking_created', user_id,
+            f"{service} {booking_date} {booking_time}",
+        )
+        return True
+
+    async def get_all_bookings(self) -> list:
+        """Все записи, отсортированные по дате и времени."""
+        cursor = await self._conn.execute(_SQL_ALL_BOOKINGS)
+        # Отдаём aiosqlite.Row как есть: доступ по имени колонки работает,
+        # а копия в dict на каждую строку — лишняя аллокация
+        return await cursor.fetchall()
+
+    async def get_user_bookings(self, user_id) -> list:
+        """Записи конкретного клиента."""
+        cursor = await self._conn.execute(_SQL_USER_BOOKINGS, (user_id,))
+        return await cursor.fetchall()
+
+    async def get_occupied_slots(self, booking_date) -> list:
+        """Занятые слоты времени на указанную дату."""
+        cursor = await self._conn.execute(_SQL_OCCUPIED_SLOTS, (booking_date,))
+        rows = await cursor.fetchall()
+        return [row[0] for row in rows]
+
+    async def get_booking_by_id(self, booking_id):
+        """Одна запись по её id или None."""
+        cursor = await self._conn.execute(
+            "SELECT * FROM bookings WHERE id = ?", (booking_id,)
+        )
+        return await cursor.fetchone()
+
+    async def search_booking_by_user_id(self, user_id) -> list:
+        """Поиск записей по Telegram ID клиента (для админа)."""
+        cursor = await self._conn.execute(_SQL_USER_BOOKINGS, (user_id,))
+        return await cursor.fetchall()
+
+    async def delete_booking(self, booking_id) -> bool:
+        """Удаляет запись. Возвращает True, если запись существовала."""
+        cursor = await self._conn.execute(
+            "DELETE FROM bookings WHERE id = ?", (booking_id,)
+        )
+        await self._conn.commit()
+        deleted = cursor.rowcount > 0
+        if deleted:
+            self._stats_cache = None
+            await self.add_statistics('booking_cancelled', details=str(booking_id))
+        return deleted
+
+    async def delete_booking_returning(self, booking_id):
+        """Удаляет запись и возвращает её поля одним запросом (или None).
+
+        DELETE ... RETURNING (SQLite 3.35+) заменяет пару
+        get_booking_by_id + delete_booking в админском удалении.
+        """
+        cursor = await self._conn.execute(
+            """DELETE FROM bookings WHERE id = ?
+               RETURNING id, user_id, username, first_name, last_name,
+                         phone, service, booking_date, booking_time""",
+            (booking_id,),
+        )
+        row = await cursor.fetchone()
+        await self._conn.commit()
+        if row is None:
+            return None
+        self._stats_cache = None
+        await self.add_statistics('booking_cancelled', details=str(booking_id))
+        return row
+
+    async def add_statistics(self, action_type, user_id=None, details=None):
+        """Ставит событие статистики в очередь; пишет фоновая задача."""
+        self._stats_queue.put_nowait((action_type, user_id, details))
+
+    async def _flush_statistics(self, rows: list) -> None:
+        await self._conn.executemany(
+            "INSERT INTO statistics (action_type, user_id, details) VALUES (?, ?, ?)",
+            rows,
+        )
+        await self._conn.commit()
+
+    async def _stats_worker(self):
+        """Фоновая задача: сбрасывает накопившуюся статистику пачками.
+
+        Убирает второй коммит (и его fsync) с пути оформления записи:
+        add_booking только кладёт событие в очередь.
+        """
+        while True:
+            rows = [await self._stats_queue.get()]
+            while len(rows) < 64:
+                try:
+                    rows.append(self._stats_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._flush_statistics(rows)
+            except Exception:
+                # Разовая ошибка записи (занятая база, диск) не должна
+                # убивать воркер: теряем пачку, но продолжаем разбирать очередь
+                logger.exception("Не удалось записать пачку статистики")
+
+    async def get_statistics_summary(self) -> dict:
+        """Сводка для админской аналитики (кэш на ~30 секунд)."""
+        if self._stats_cache and time.monotonic() - self._stats_cache[0] < 30:
+            return self._stats_cache[1]
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        async def counts():
+            cursor = await self._conn.execute(
+                """SELECT COUNT(*),
+                          SUM(CASE WHEN booking_date = ? THEN 1 ELSE 0 END),
+                          COUNT(DISTINCT user_id)
+                   FROM bookings""",
+                (today,),
+            )
+            return await cursor.fetchone()
+
+        async def popular():
+            cursor = await self._conn.execute(
+                """SELECT service, COUNT(*) AS cnt FROM bookings
+                   GROUP BY service ORDER BY cnt DESC LIMIT 5"""
+            )
+            return await cursor.fetchall()
+
+        # Один проход по таблице для всех счётчиков + параллельная
+        # диспетчеризация второго запроса
+        (total, today_cnt, unique), popular_services = await asyncio.gather(
+            counts(), popular()
+        )
+        summary = {
+            'total_bookings': total,
+            'today_bookings': today_cnt or 0,
+            'unique_clients': unique,
+            'popular_services': popular_services,
+        }
+        self._stats_cache = (time.monotonic(), summary)
+        return summary
+
+    async def get_max_admin_user_id(self):
+        """Наибольший синтетический user_id (>= 900000000) или None."""
+        cursor = await self._conn.execute(
+            "SELECT MAX(user_id) FROM bookings WHERE user_id >= 900000000"
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_admin_id(self, admin_id):
+        """Сохраняет ID администратора в настройках."""
+        await self._conn.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES ('admin_id', ?)",
+            (str(admin_id),),
+        )
+        await self._conn.commit()
+
+    async def get_admin_id(self):
+        """ID администратора из настроек или None."""
+        cursor = await self._conn.execute(
+            "SELECT value FROM settings WHERE key = 'admin_id'"
+        )
+        row = await cursor.fetchone()
+        return int(row[0]) if row else None
+
+    async def close(self):
+        """Останавливает фоновую запись и закрывает общее соединение."""
+        if self._stats_task is not None:
+            self._stats_task.cancel()
+            try:
+                await self._stats_task
+            except asyncio.CancelledError:
+                pass
+            self._stats_task = None
+        if self._conn is not None:
+            # Дописываем то, что осталось в очереди
+            rows = []
+            while self._stats_queue is not None and not self._stats_queue.empty():
+                rows.append(self._stats_queue.get_nowait())
+            if rows:
+                await self._flush_statistics(rows)
+            # Обновляет статистику планировщика к следующему запуску
+            await self._conn.execute("PRAGMA optimize")
+            await self._conn.close()
+            self._conn = None
+
+
+db = Database()